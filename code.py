@@ -17,7 +17,7 @@
 # Tested with Adafruit CircuitPython 8.2.6 on 2023-09-12; TinyS3 with ESP32S3
 # My WOPR has the analog audio shield installed.  
 # These Circuitpython libraries are in /lib
-# adafruit_bus_device, adafruit_ht16k33, adafruit_debouncer, adafruit_ntp, adafruit_ticks
+# adafruit_bus_device, adafruit_ht16k33, adafruit_ntp, adafruit_ticks
 # Does it work on a TinyPICO?  Dunno don't have a TinyPICO, your mileage may vary. 
 #
 # WOPR kit available here: 
@@ -25,14 +25,12 @@
 
 import time, rtc
 import neopixel
-import board, digitalio
+import board
+import keypad
 import tinys3
 from adafruit_ht16k33.segments import Seg14x4
-from adafruit_debouncer import Debouncer
 import pwmio
-import wifi, socketpool
-import adafruit_ntp
-import random
+import wifi
 import adafruit_ticks
 
 WOPR_BUTTON_1=board.D2
@@ -42,6 +40,18 @@ WOPR_BUTTON_4=board.D6
 WOPR_AUDIO_PIN=board.D21
 WOPR_DEFCON_LEDS=board.D4
 
+# Set True to print padded strings from wopr_text() to the serial usb 
+DEBUG_WOPR_TEXT = False
+
+# Colors for the top-fire LEDs during codebreaking as RGB tuples
+DEFCON_COLORS = ((255,255,255),
+                 (255,0,0),
+                 (255,255,0),
+                 (0,255,0),
+                 (0,0,255))
+# Codes that appear during the "random" display during codebreaking
+CODES = b"ABCDEF0123456789"
+
 def connect_wifi():
     """
     Setup WiFi connection using ssid/password from secrets
@@ -49,8 +59,10 @@ def connect_wifi():
     if wifi.radio.ipv4_address is not None:
         return
     pixel.fill((0,255,255))
+    pixel.show()
     try:
         pixel.fill((0,0,255))
+        pixel.show()
         wopr_text("WIFI CONNECT")
         print("Connecting to %s" % secrets["ssid"])
         wifi.radio.connect(secrets["ssid"], secrets["password"])
@@ -61,37 +73,79 @@ def connect_wifi():
     # Wi-Fi connectivity fails with error messages, not specific errors, so this except is broad.
     except Exception as e:  # pylint: disable=broad-except
         pixel.fill((255,0,0))
+        pixel.show()
         wopr_text("WiFi ERROR")
         raise
     pixel.fill((0,255,0))
+    pixel.show()
 
-def wopr_text(s, pad=False):
+# Last string sent to the display by wopr_text(), so the same text isn't sent again
+_last_text = None
+
+def wopr_text(s, pad=False, force=False):
     """
     Convenience function to clear the wopr display and show text.
     If pad is True then string will be padded with spaces to force 
     left-align or cut off extra text.  
+    Nothing is sent to the display if the text is the same as last time, 
+    unless force is True (use this if something else drew on the display). 
     """
+    global _last_text
     if pad==True:
-        s2="{0}            ".format(s)[:12]
-        print("Original string was  [{0}]".format(s))
+        s2=(s + "            ")[:12]
+        if DEBUG_WOPR_TEXT:
+            print("Original string was  [{0}]".format(s))
+            print("Padded string is now [{0}]".format(s2))
         s=s2
-        print("Padded string is now [{0}]".format(s))
+    if s == _last_text and not force:
+        return
+    _last_text = s
     wopr_display.fill(0)
     wopr_display.print(s)
     wopr_display.show()
 
+# Two digit strings "00" -> "59" for format_datetime(), made once instead of formatting every time
+_DD = ["%02d" % i for i in range(60)]
+
 def format_datetime(datetime):
     """
     Simple pretty-print for a datetime object
 
     :param datetime: A datetime object 
     """
-    # pylint: disable=consider-using-f-string
-    return "{:02} {:02} {:02} ".format(
-        datetime.tm_hour,
-        datetime.tm_min,
-        datetime.tm_sec,
-    )
+    return _DD[datetime.tm_hour] + " " + _DD[datetime.tm_min] + " " + _DD[datetime.tm_sec] + " "
+
+def next_clock_second():
+    """
+    ticks (ms) when the clock reaches its next whole second, so redraws line up 
+    with the seconds changing instead of drifting on a free-running timer
+    """
+    elapsed = adafruit_ticks.ticks_diff(adafruit_ticks.ticks_ms(),clock_ticks)
+    return adafruit_ticks.ticks_add(clock_ticks,(elapsed//1000 + 1)*1000)
+
+def resume_clock():
+    """
+    Go back to showing the clock after a blocking action (demo or codebreak) took over the display: 
+    put the clock back on the next second, cancel any marquee, and forget buttons pushed while we were busy 
+    """
+    global next_tick, marquee_text
+    next_tick = next_clock_second()
+    marquee_text = None
+    keys.events.clear()
+
+def set_clock_reference():
+    """
+    Remember the time (seconds) and ticks (ms) from the RTC as the reference point for the clock. 
+    Waits (up to 1 second) for the RTC second to change so the ticks line up with the start of a second, 
+    so only use this at startup, not from the main loop. 
+    """
+    global clock_epoch, clock_ticks
+    start = time.time()
+    now = start
+    while now == start:
+        now = time.time()
+    clock_ticks = adafruit_ticks.ticks_ms()
+    clock_epoch = now
 
 def wopr_beep(frequency,beep_time,duty_cycle=0.5, continuous=False):
     """
@@ -104,12 +158,50 @@ def wopr_beep(frequency,beep_time,duty_cycle=0.5, continuous=False):
     :param continuous: False: tone stops at end of beep_time. True: tone continues to play after function returns
                         and you will have to stop it yourself. 
     """
-    audio.frequency = frequency
-    audio.duty_cycle = int(65535 * duty_cycle)  
+    global _beep_off_at
+    _beep_off_at = None  # Cancel any tone from beep_start(), this one takes over 
+    _tone_on(frequency, duty_cycle)
     time.sleep(beep_time) 
     if continuous==False:
         audio.duty_cycle = 0
 
+# ticks (ms) when the tone started by beep_start() should stop, None if no tone is playing
+_beep_off_at = None
+
+def beep_start(frequency,beep_time,duty_cycle=0.5):
+    """
+    Non-blocking version of wopr_beep().  Starts the tone and returns right away, 
+    call beep_service() regularly to turn it off when the time is up.
+
+    :param frequency: Frequency of tone in Hz
+    :param beep_time: Time for tone to sound in seconds 
+    :param duty_cycle: duty cycle of pwm expressed as 0.0 - 1.0 
+    """
+    global _beep_off_at
+    _tone_on(frequency, duty_cycle)
+    _beep_off_at = adafruit_ticks.ticks_add(adafruit_ticks.ticks_ms(),int(beep_time*1000))
+
+def beep_service():
+    """
+    Turns off the tone started by beep_start() once its time is up.
+    Returns True if a tone is still playing. 
+    """
+    global _beep_off_at
+    if _beep_off_at is not None and not adafruit_ticks.ticks_less(adafruit_ticks.ticks_ms(),_beep_off_at):
+        audio.duty_cycle = 0
+        _beep_off_at = None
+    return _beep_off_at is not None
+
+def _tone_on(frequency,duty_cycle=0.5):
+    """
+    Start the pwm tone playing, shared by wopr_beep() and beep_start() 
+
+    :param frequency: Frequency of tone in Hz
+    :param duty_cycle: duty cycle of pwm expressed as 0.0 - 1.0 
+    """
+    audio.frequency = frequency
+    audio.duty_cycle = int(65535 * duty_cycle)
+
 def wopr_button_beep(beep_type=1):
     """
     Convenience function to hold two beeps for when buttons are pushed/released
@@ -123,7 +215,7 @@ def wopr_solve_movie():
     """
     WOPR codebreaks the code as seen in the movie 'WarGames' 
     """
-    missile_code_movie = ['C','P','E',' ','1','7','0','4',' ','T','K','S']
+    missile_code_movie = b"CPE 1704 TKS"
     solve_order_movie = [7,1,4,6,11,2,5,0,10,9]
     wopr_solve(missile_code_movie, solve_order_movie)
 
@@ -132,19 +224,11 @@ def wopr_solve(solved_code, solved_order):
     """
     WOPR codebreaks the given code in the order provided
     
-    :param solved_code: list of characters showing what the solved code should be 
+    :param solved_code: bytes showing what the solved code should be (12 characters)
     :param solved_order: list showing order in which characters should get "solved" of code. Characters
                             not included will not cycle in the display
     """
-
-    # Colors for the top-fire LEDs as RGB tuples
-    defcon_colors =[ (255,255,255),
-                    (255,0,0),
-                    (255,255,0),
-                    (0,255,0),
-                    (0,0,255)]
-    # Codes that appear during the "random" display during codebreaking
-    codes = ['A','B','C','D','E','F','0','1','2','3','4','5','6','7','8','9','0']
+    import random  # Only needed for codebreaking, so it's imported the first time we get here
 
     # ticks (ms) min and max interval that a solution will be "found" (randomly chosen)
     solve_interval_min = 4000
@@ -153,65 +237,92 @@ def wopr_solve(solved_code, solved_order):
 
     # Set LEDs off and display blank 
     defconLED.fill((0,0,0))
+    defconLED.show()
     wopr_text("")
 
     solveCount=0
     percent_solved = 0 
-    current_solution=[' ',' ',' ',' ',' ',' ',' ',' ',' ',' ',' ',' ']
-    while solveCount < len(solved_order):
+    current_solution=bytearray(b"            ")  # Characters are changed in place, no new list or string each time 
+    # Things that don't change while codebreaking, look them up once. 
+    # Functions used in the loops are bound to local names, locals are faster to look up than globals 
+    len_order = len(solved_order)
+    ticks_ms = adafruit_ticks.ticks_ms
+    ticks_less = adafruit_ticks.ticks_less
+    ticks_add = adafruit_ticks.ticks_add
+    randint = random.randint
+    choice = random.choice
+    get_event = keys.events.get
+    _wopr_text = wopr_text
+    _wopr_beep = wopr_beep
+    _beep_start = beep_start
+    _beep_service = beep_service
+    while solveCount < len_order:
         # Calculate how long to 'codebreak' before 'solving' next character
-        ticks_now = adafruit_ticks.ticks_ms()
-        ticks_wait = int(random.randint(solve_interval_min,solve_interval_max)*solve_interval_multiplier)
-        ticks_next = adafruit_ticks.ticks_add(ticks_now,ticks_wait)
+        ticks_now = ticks_ms()
+        ticks_wait = int(randint(solve_interval_min,solve_interval_max)*solve_interval_multiplier)
+        ticks_next = ticks_add(ticks_now,ticks_wait)
+        next_draw = ticks_ms()
         # Show random character codebreaking, 'solved' characters don't change 
-        while adafruit_ticks.ticks_less(adafruit_ticks.ticks_ms(),ticks_next):
-            BUT2_debounce.update()  # Push and release button to abort 
-            if BUT2_debounce.fell:
-                wopr_text("ABORT")
-                wopr_beep(1500,0.5,0.5)
+        while ticks_less(ticks_ms(),ticks_next):
+            ev = get_event()  # Push button 2 to abort, other buttons are ignored here 
+            if ev and ev.key_number==1 and ev.pressed:
+                _wopr_text("ABORT")
+                _wopr_beep(1500,0.5,0.5)
                 return
-            # random "computer sound" beeps and boops
-            wopr_beep(random.randint(90,250),0.05,0.5,continuous=True)
-            for i in range(solveCount,len(solved_order)):
-                current_solution[solved_order[i]]=codes[random.randint(0,len(codes)-1)]
-            current_solution_string = "".join(current_solution)  # join character list into string
-            wopr_text(current_solution_string)   # display string on wopr
+            # random "computer sound" beeps and boops, a new one starts as soon as the last one ends 
+            if not _beep_service():
+                _beep_start(randint(90,250),0.05,0.5)
+            # Only redraw about 30 times a second, nobody can see it any faster
+            if not ticks_less(ticks_ms(),next_draw):
+                for i in range(solveCount,len_order):
+                    current_solution[solved_order[i]]=choice(CODES)
+                _wopr_text(str(current_solution,"ascii"))   # display string on wopr
+                next_draw = ticks_add(ticks_ms(),33)
         # The code with a new character "solved" 
         current_solution[solved_order[solveCount]]=solved_code[solved_order[solveCount]]
-        current_solution_string = "".join(current_solution)
-        wopr_text(current_solution_string)
+        _wopr_text(str(current_solution,"ascii"))
         solveCount += 1
         # Calculate perecentage through codebreak so that defcon 4 is lit just before the last character is found
-        percent_solved = int((1.0 - solveCount / len(solved_order))*4)+1
+        percent_solved = 1 + (4*(len_order - solveCount))//len_order
         defconLED.fill((0,0,0))
-        defconLED[percent_solved]=defcon_colors[percent_solved]
-        wopr_beep(1500,0.5,0.5)
+        defconLED[percent_solved]=DEFCON_COLORS[percent_solved]
+        defconLED.show()
+        _wopr_beep(1500,0.5,0.5)
 
     # Flash "broken" code on display 
     defconLED.fill((0,0,0))
-    defconLED[0]=defcon_colors[0]
+    defconLED[0]=DEFCON_COLORS[0]
+    defconLED.show()
     time.sleep(1)
     for x in range(5):
         defconLED.fill((0,0,0))
-        wopr_text("")
+        defconLED.show()
+        _wopr_text("")
         time.sleep(0.5)
-        defconLED[0]=defcon_colors[0]
-        wopr_text(current_solution_string)
-        wopr_beep(1500,0.5,0.5)
+        defconLED[0]=DEFCON_COLORS[0]
+        defconLED.show()
+        _wopr_text(str(current_solution,"ascii"))
+        _wopr_beep(1500,0.5,0.5)
     # Flash ominous "Launching" text 
     for x in range(5):
-        wopr_text("")
+        _wopr_text("")
         time.sleep(0.5)
-        wopr_text("LAUNCHING ...")
+        _wopr_text("LAUNCHING ...")
         time.sleep(0.5)
 
-# Neopixel LED setup 
-pixel = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.3, auto_write=True, pixel_order=neopixel.RGB)  # Neopixel on TinyS3
-defconLED = neopixel.NeoPixel(WOPR_DEFCON_LEDS, 5, brightness=0.5,auto_write=True)  # Five Neopixel on top of WOPR (0 -> 4 is right to left)
+# Neopixel LED setup, auto_write is off so call .show() once after changing pixels 
+pixel = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.3, auto_write=False, pixel_order=neopixel.RGB)  # Neopixel on TinyS3
+defconLED = neopixel.NeoPixel(WOPR_DEFCON_LEDS, 5, brightness=0.5,auto_write=False)  # Five Neopixel on top of WOPR (0 -> 4 is right to left)
 
 # Create a colour wheel index int
 color_index = 0
 
+# Precompute the colour wheel once so the main loop only has to index a list
+# (rgb_color_wheel() repeats every 255 steps, so the table has 255 entries)
+WHEEL = [tinys3.rgb_color_wheel(i) for i in range(255)]
+# All five defcon LED colours for each step of the rainbow chase, so they can be set with one slice assignment
+DEFCON_FRAMES = [tuple(WHEEL[(phase+i*3) % 255] for i in range(5)) for phase in range(255)]
+
 # Turn on the power to the NeoPixel
 tinys3.set_pixel_power(True)
 
@@ -223,26 +334,9 @@ i2c = board.I2C()
 wopr_display = Seg14x4(i2c, address=(0x70,0x72,0x74), auto_write=False)
 wopr_text("HELLO WORLD")
 
-# Setup debounced buttons (two on the front, two on the back  )
-BUT1 = digitalio.DigitalInOut(WOPR_BUTTON_1)
-BUT1.direction = digitalio.Direction.INPUT
-BUT1.pull = digitalio.Pull.UP
-BUT1_debounce = Debouncer(BUT1)
-
-BUT2 = digitalio.DigitalInOut(WOPR_BUTTON_2)
-BUT2.direction = digitalio.Direction.INPUT
-BUT2.pull = digitalio.Pull.UP
-BUT2_debounce = Debouncer(BUT2)
-
-BUT3 = digitalio.DigitalInOut(WOPR_BUTTON_3)
-BUT3.direction = digitalio.Direction.INPUT
-BUT3.pull = digitalio.Pull.UP
-BUT3_debounce = Debouncer(BUT3)
-
-BUT4 = digitalio.DigitalInOut(WOPR_BUTTON_4)
-BUT4.direction = digitalio.Direction.INPUT
-BUT4.pull = digitalio.Pull.UP
-BUT4_debounce = Debouncer(BUT4)
+# Setup buttons (two on the front, two on the back  )
+# keypad scans and debounces them in the background, key_number 0 -> 3 is BUT1 -> BUT4
+keys = keypad.Keys((WOPR_BUTTON_1, WOPR_BUTTON_2, WOPR_BUTTON_3, WOPR_BUTTON_4), value_when_pressed=False, pull=True)
 
 # Get WiFi Parameters and timezone 
 try:
@@ -255,48 +349,103 @@ connect_wifi()
 # Get local time from NTP server, your time zone offset is 'tz_offset' in secrets.py
 # https://github.com/todbot/circuitpython-tricks#set-rtc-time-from-ntp
 wopr_text("SET TIME")
+# socketpool and adafruit_ntp are only needed here, import them now instead of at the top 
+import socketpool
 pool = socketpool.SocketPool(wifi.radio)
 try:
+    import adafruit_ntp
     ntp = adafruit_ntp.NTP(pool, tz_offset=secrets['tz_offset'])
+    # Short socket timeout for the hourly resync in the main loop so it can't stall the display for long
+    ntp_resync = adafruit_ntp.NTP(pool, tz_offset=secrets['tz_offset'], socket_timeout=2)
 except Exception as e:        
     pixel.fill((255,0,0))
+    pixel.show()
     wopr_text("TIME ERROR")
     raise 
 rtc.RTC().datetime = ntp.datetime  
 print("current time:", format_datetime(time.localtime()))
 
+# Remember the time (seconds) and ticks (ms) when the clock was set, the displayed time 
+# is worked out from ticks since then instead of reading the RTC every time 
+set_clock_reference()
+
+# ticks (ms) when the clock should next be set from NTP again, every hour to correct for drift 
+next_resync = adafruit_ticks.ticks_add(clock_ticks,3600000)
+# ticks (ms) when the clock should next be redrawn, on each whole second
+next_tick = adafruit_ticks.ticks_ms()
+# ticks (ms) when the rainbow LEDs should take their next step 
+next_rainbow = adafruit_ticks.ticks_ms()
+# Text scrolling across the display for BUT4 (None when not scrolling), position in it, and ticks (ms) for the next step
+marquee_text = None
+marquee_pos = 0
+marquee_next = 0
+
 # Main forever loop 
 while True:
-    # Must refresh buttons in the loop for debouncing to work 
-    # If a button's status .fell is True, that means the button was released 
-    # If a button's status .rose is True, that means the button was pushed 
-    BUT1_debounce.update()
-    BUT2_debounce.update()
-    BUT3_debounce.update()
-    BUT4_debounce.update()
-
-    wopr_text(format_datetime(time.localtime()))  # display time on wopr display 
+    # Get the next button event (if any) from keypad 
+    # 'pressed' is the key_number of a button that went down, 'released' of a button that came back up
+    pressed = released = None
+    ev = keys.events.get()
+    if ev:
+        if ev.pressed:
+            pressed = ev.key_number
+        else:
+            released = ev.key_number
+
+    # Scroll the marquee one character at a time, the clock waits until it's done 
+    if marquee_text is not None:
+        if not adafruit_ticks.ticks_less(adafruit_ticks.ticks_ms(),marquee_next):
+            if marquee_pos + 12 <= len(marquee_text):
+                wopr_text(marquee_text[marquee_pos:marquee_pos+12])
+                marquee_pos += 1
+                marquee_next = adafruit_ticks.ticks_add(adafruit_ticks.ticks_ms(),250)
+            else:
+                marquee_text = None
+                next_tick = next_clock_second()  # Put the clock back on the next second 
+    # display time on wopr display, only once a second 
+    elif not adafruit_ticks.ticks_less(adafruit_ticks.ticks_ms(),next_tick):
+        # Set the clock from NTP again every hour to correct for drift, 
+        # skipped if WiFi has dropped so we don't wait on a request that can't work 
+        if not adafruit_ticks.ticks_less(adafruit_ticks.ticks_ms(),next_resync):
+            next_resync = adafruit_ticks.ticks_add(adafruit_ticks.ticks_ms(),3600000)
+            resynced = False
+            if wifi.radio.ipv4_address is None:
+                print("No WiFi for NTP resync, will try again in an hour")
+            else:
+                try:
+                    rtc.RTC().datetime = ntp_resync.datetime
+                    # Setting the RTC starts a fresh second, so this is the new reference point 
+                    clock_ticks = adafruit_ticks.ticks_ms()
+                    clock_epoch = time.time()
+                    resynced = True
+                except Exception as e:  # pylint: disable=broad-except
+                    print("NTP resync failed, will try again in an hour:", e)
+            if not resynced:
+                # Keep the same reference, just move it forward by whole seconds so ticks_diff() stays in range 
+                seconds = adafruit_ticks.ticks_diff(adafruit_ticks.ticks_ms(),clock_ticks) // 1000
+                clock_epoch += seconds
+                clock_ticks = adafruit_ticks.ticks_add(clock_ticks,seconds*1000)
+        elapsed = adafruit_ticks.ticks_diff(adafruit_ticks.ticks_ms(),clock_ticks)
+        wopr_text(format_datetime(time.localtime(clock_epoch + elapsed // 1000)))
+        next_tick = next_clock_second()
 
     # Button actions 
-    if BUT1_debounce.fell:
-        print("Release Button 1")
+    if pressed==0:
+        print("Press Button 1")
         wopr_button_beep(2)
 
     # Show a text and audio demo when BUT1 is released 
-    if BUT1_debounce.rose:
+    if released==0:
         wopr_text("WOPR DEMO")
         wopr_button_beep()
-        print("Press Button 1")
+        print("Release Button 1")
         time.sleep(1)
 
         wopr_text("AUDIO")
         # https://learn.adafruit.com/circuitpython-essentials/circuitpython-pwm
         for f in (262, 294, 330, 349, 392, 440, 494, 523):
-                audio.frequency = f
-                audio.duty_cycle = 65535 // 2  
-                time.sleep(0.05)  
-                audio.duty_cycle = 0  # Off
-                time.sleep(0.01)
+                wopr_beep(f, 0.05)
+                time.sleep(0.01)  # Short gap between notes 
         wopr_text("AUDIO DONE")
         time.sleep(1)
 
@@ -325,51 +474,60 @@ while True:
         wopr_display.show()
         time.sleep(1)
 
-        wopr_text("DEMO OVER")
+        wopr_text("DEMO OVER", force=True)
         time.sleep(1)
+        resume_clock()
 
     # Do the classic 'WarGames' codebreaking
-    if BUT2_debounce.fell:
+    if pressed==1:
         wopr_button_beep(2)
-        print("Release Button 2")
+        print("Press Button 2")
         wopr_solve_movie()
+        resume_clock()
 
-    if BUT2_debounce.rose:
+    if released==1:
         wopr_button_beep()
-        print("Press Button 2")
+        print("Release Button 2")
 
     # Do the UnexpectedMaker "LOLZ FOR YOU" codebreak, showing how to use wopr_solve()
-    if BUT3_debounce.fell:
-        print("Release Button 3")
+    if pressed==2:
+        print("Press Button 3")
         wopr_button_beep(2)
-        lulz = ['L','O','L','Z',' ','F','O','R',' ','Y','O','U']
+        lulz = b"LOLZ FOR YOU"
         lulz_order=[0,1,2,3,5,6,7,9,10,11]
         wopr_solve(lulz,lulz_order)
+        resume_clock()
 
-    if BUT3_debounce.rose:
+    if released==2:
         wopr_button_beep()
-        print("Press Button 3")
+        print("Release Button 3")
 
-    if BUT4_debounce.fell:
+    if pressed==3:
         wopr_button_beep(2)
-        print("Release Button 4")
+        print("Press Button 4")
 
-    # Marquee scroll a long piece of text (blocks execution until done )
-    if BUT4_debounce.rose:
+    # Marquee scroll a long piece of text, the main loop does the scrolling so buttons and LEDs keep working 
+    # Leading spaces make the text scroll in from the right, trailing spaces scroll it off the left 
+    if released==3:
         wopr_button_beep()
-        print("Press Button 4")
-        wopr_display.marquee("DON'T FORGET TO DRINK YOUR OVALTINE            ",loop=False)
-
-    # Get the R,G,B values of the next colour for the LEDs
-    r,g,b = tinys3.rgb_color_wheel( color_index )
-    # Set the colour on the NeoPixel on the TinyS3
-    pixel[0] = ( r, g, b, 0.5)
-    # Slight rainbow chase on the WOPR defcon LEDs when showing time 
-    for i in range(5):
-        defconLED[i]=tinys3.rgb_color_wheel(color_index+i*3)
-    # Increase the wheel index
-    color_index += 1
-
-    # Sleep for 15ms so the colour cycle isn't too fast
-    time.sleep(0.015)
+        print("Release Button 4")
+        marquee_text = "           DON'T FORGET TO DRINK YOUR OVALTINE            "
+        marquee_pos = 0
+        marquee_next = adafruit_ticks.ticks_ms()
+
+    # Step the colours every 15ms so the colour cycle isn't too fast, 
+    # the rest of the time the loop keeps checking buttons 
+    if not adafruit_ticks.ticks_less(adafruit_ticks.ticks_ms(),next_rainbow):
+        # Get the R,G,B values of the next colour for the LEDs
+        r,g,b = WHEEL[color_index]
+        # Set the colour on the NeoPixel on the TinyS3
+        pixel[0] = ( r, g, b, 0.5)
+        # Slight rainbow chase on the WOPR defcon LEDs when showing time 
+        defconLED[0:5]=DEFCON_FRAMES[color_index]
+        # Send the new colours out to the LEDs in one go 
+        pixel.show()
+        defconLED.show()
+        # Increase the wheel index, wrapping around at the end of the wheel 
+        color_index = (color_index + 1) % 255
+        next_rainbow = adafruit_ticks.ticks_add(adafruit_ticks.ticks_ms(),15)
 